@@ -16,6 +16,7 @@ engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     pool_recycle=300,
+    query_cache_size=1200,  # Room for the many distinct risk-scoring and screening statements
     echo=False  # Set to True for SQL query logging
 )
 
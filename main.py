@@ -27,7 +27,7 @@ from models import *
 from aml_controls import AMLControlEngine
 from ml_engine import MLAnomlyEngine
 from risk_scoring import RiskScoringEngine
-from sanctions_screening import SanctionsScreeningEngine
+from sanctions_screening import SanctionsScreeningEngine, invalidate_screening_cache
 from notification_service import NotificationService
 from currency_service import CurrencyService
 from case_management import CaseManagementService
@@ -154,22 +154,27 @@ async def lifespan(app: FastAPI):
             {"full_name": "Angela Merkel", "country": "Germany", "position": "Former Chancellor"},
             {"full_name": "Xi Jinping", "country": "China", "position": "President"},
         ]
-        for pep_data in pep_list:
-            pep_exists = db.query(PEPList).filter(PEPList.full_name == pep_data["full_name"]).first()
-            if not pep_exists:
-                new_pep = PEPList(**pep_data)
-                db.add(new_pep)
+        existing_peps = {
+            row.full_name for row in db.query(PEPList.full_name).filter(
+                PEPList.full_name.in_([pep_data["full_name"] for pep_data in pep_list])
+            )
+        }
+        db.add_all([PEPList(**pep_data) for pep_data in pep_list if pep_data["full_name"] not in existing_peps])
         
         # Populate SanctionsList
         sanctions_list = [
             {"entity_name": "Al-Qaeda", "list_name": "UN Sanctions", "entity_type": "Organization"},
             {"entity_name": "Islamic State of Iraq and the Levant (ISIL)", "list_name": "UN Sanctions", "entity_type": "Organization"},
         ]
-        for sanction_data in sanctions_list:
-            sanction_exists = db.query(SanctionsList).filter(SanctionsList.entity_name == sanction_data["entity_name"]).first()
-            if not sanction_exists:
-                new_sanction = SanctionsList(**sanction_data)
-                db.add(new_sanction)
+        existing_sanctions = {
+            row.entity_name for row in db.query(SanctionsList.entity_name).filter(
+                SanctionsList.entity_name.in_([sanction_data["entity_name"] for sanction_data in sanctions_list])
+            )
+        }
+        db.add_all([
+            SanctionsList(**sanction_data) for sanction_data in sanctions_list
+            if sanction_data["entity_name"] not in existing_sanctions
+        ])
         
         # Ensure admin user also has a customer account for testing Control 1
         admin_customer_id = admin_user.username # Use admin's username as customer_id
@@ -972,6 +977,7 @@ async def screen_bulk_entities(file: UploadFile = File(...), db: Session = Depen
     try:
         contents = await file.read()
         decoded_content = contents.decode('utf-8').splitlines()
+        entries = []
         for line in decoded_content:
             line = line.strip()
             if not line:
@@ -986,8 +992,8 @@ async def screen_bulk_entities(file: UploadFile = File(...), db: Session = Depen
             
             logger.info(f"Processing bulk entry - Name: {name}, Country: {country}")
             
-            # Construct dummy transaction_data for screen_transaction
-            transaction_data = {
+            # Construct dummy transaction_data for screen_batch
+            entries.append({
                 "customer_id": "bulk_entity_screening", # Dummy ID
                 "counterparty_name": name,
                 "counterparty_country": country, # Pass country for screening
@@ -995,15 +1001,15 @@ async def screen_bulk_entities(file: UploadFile = File(...), db: Session = Depen
                 "amount": 0,
                 "currency": "USD",
                 "channel": "BulkScreening"
-            }
-            logger.info(f"Constructed transaction_data for bulk screening: {transaction_data}")
-            
-            screening_results = await sanctions_engine.screen_transaction(transaction_data, db)
-            logger.info(f"Sanctions engine returned for bulk entry: {screening_results}")
-            
+            })
+
+        # Screen the whole file in one batch so repeated names are matched once
+        batch_results = await sanctions_engine.screen_batch(entries, db)
+
+        for transaction_data, screening_results in zip(entries, batch_results):
             results.append({
-                "name": name,
-                "country": country,
+                "name": transaction_data["counterparty_name"],
+                "country": transaction_data["counterparty_country"],
                 "sanctions_matches": screening_results.get("matches", []),
                 "pep_matches": screening_results.get("pep_matches", []),
                 "adverse_media_hits": screening_results.get("adverse_media_hits", []),
@@ -1210,6 +1216,7 @@ async def add_pep_list_entry(
     db.add(new_entry)
     db.commit()
     db.refresh(new_entry)
+    invalidate_screening_cache()
     return {"message": "PEP list entry added successfully!", "id": str(new_entry.id)}
 
 @app.put("/api/pep/lists/{pep_id}")
@@ -1231,6 +1238,7 @@ async def update_pep_list_entry(
 
     db.commit()
     db.refresh(existing_entry)
+    invalidate_screening_cache()
     return {"message": "PEP list entry updated successfully!", "id": str(existing_entry.id)}
 
 # Pydantic model for creating a new SanctionsList entry
@@ -1275,6 +1283,7 @@ async def add_sanctions_list_entry(
     db.add(new_entry)
     db.commit()
     db.refresh(new_entry)
+    invalidate_screening_cache()
     return {"message": "Sanctions list entry added successfully!", "id": str(new_entry.id)}
 
 @app.put("/api/sanctions/lists/{list_id}")
@@ -1301,6 +1310,7 @@ async def update_sanctions_list_entry(
 
     db.commit()
     db.refresh(existing_entry)
+    invalidate_screening_cache()
     return {"message": "Sanctions list entry updated successfully!", "id": str(existing_entry.id)}
 
 @app.get("/api/sanctions/lists/{list_id}")
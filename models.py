@@ -2,7 +2,7 @@
 Database models for Banking AML Transaction Monitoring System
 """
 
-from sqlalchemy import Column, String, Float, DateTime, Boolean, Integer, Text, ForeignKey, JSON, Enum
+from sqlalchemy import Column, String, Float, DateTime, Boolean, Integer, Text, ForeignKey, JSON, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -150,6 +150,9 @@ class Transaction(Base):
     customer = relationship("Customer", back_populates="transactions")
     alerts = relationship("Alert", back_populates="transaction")
 
+# Per-customer time-window scans (risk scoring, velocity, pattern analysis)
+Index('ix_txn_customer_created', Transaction.customer_id, Transaction.created_at.desc())
+
 class Alert(Base):
     __tablename__ = "alerts"
     
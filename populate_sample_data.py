@@ -1,5 +1,6 @@
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
 import uuid
@@ -25,18 +26,46 @@ def get_db():
     finally:
         db.close()
 
+def clear_existing_data():
+    """Empty every table while keeping the existing schema and indexes"""
+    Base.metadata.create_all(engine) # Only creates tables that are missing
+    with engine.begin() as connection:
+        connection.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
+        for table in reversed(Base.metadata.sorted_tables):
+            connection.execute(text(f"TRUNCATE TABLE {table.name}"))
+        connection.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
+
 def generate_sample_data(num_customers=100, num_transactions_per_customer=50):
     print("Generating sample data...")
     db = next(get_db())
     
     # Clear existing data (optional, for fresh start)
-    Base.metadata.drop_all(engine)
-    Base.metadata.create_all(engine)
+    clear_existing_data()
 
     customers = []
     accounts = []
     transactions = []
 
+    # Pre-generate the random transaction fields for every customer in one go
+    rng = np.random.default_rng()
+    num_transactions = num_customers * num_transactions_per_customer
+    now = datetime.now()
+    txn_days_ago = rng.integers(1, 91, num_transactions).tolist() # Last 90 days
+    txn_amounts = np.round(rng.uniform(10, 5000, num_transactions), 2).tolist()
+    txn_types = rng.choice(["DEBIT", "CREDIT", "TRANSFER"], num_transactions).tolist()
+    txn_channels = rng.choice(["ONLINE", "ATM", "POS", "BRANCH"], num_transactions).tolist()
+    txn_counterparty_accounts = rng.integers(100000000, 1000000000, num_transactions).tolist()
+    txn_counterparty_names = rng.integers(100, 1000, num_transactions).tolist()
+    txn_counterparty_banks = rng.integers(1, 6, num_transactions).tolist()
+    txn_counterparty_countries = rng.choice(["USA", "GBR", "CAN"], num_transactions).tolist()
+    txn_references = rng.integers(10000, 100000, num_transactions).tolist()
+    txn_narratives = rng.choice(["Payment", "Deposit", "Withdrawal", "Transfer"], num_transactions).tolist()
+    txn_risk_scores = np.round(rng.uniform(0.1, 0.9, num_transactions), 2).tolist()
+    txn_is_suspicious = rng.integers(0, 2, num_transactions).astype(bool).tolist()
+    txn_is_cross_border = rng.integers(0, 2, num_transactions).astype(bool).tolist()
+    txn_ml_predictions = rng.choice(["ANOMALY", "NORMAL"], num_transactions).tolist()
+    txn_index = 0
+
     for _ in range(num_customers):
         customer_id = str(uuid.uuid4())
         customer_email = f"user{random.randint(1000, 9999)}@example.com"
@@ -79,30 +108,31 @@ def generate_sample_data(num_customers=100, num_transactions_per_customer=50):
         db.flush() # Flush to get account_number into database before transactions
 
         for _ in range(num_transactions_per_customer):
-            transaction_date = datetime.now() - timedelta(days=random.randint(1, 90)) # Last 90 days
-            amount = round(random.uniform(10, 5000), 2)
+            transaction_date = now - timedelta(days=txn_days_ago[txn_index])
+            amount = txn_amounts[txn_index]
             transaction = Transaction(
                 id=str(uuid.uuid4()),
                 customer_id=customer_id,
                 account_number=account_number, # This account_number should now exist in DB
-                transaction_type=random.choice(["DEBIT", "CREDIT", "TRANSFER"]),
+                transaction_type=txn_types[txn_index],
                 amount=amount,
                 base_amount=amount, # Assuming USD for simplicity
                 currency="USD",
-                channel=random.choice(["ONLINE", "ATM", "POS", "BRANCH"]),
-                counterparty_account=f"CP{random.randint(100000000, 999999999)}",
-                counterparty_name=f"CP Name {random.randint(100, 999)}",
-                counterparty_bank=f"Bank {random.randint(1, 5)}",
-                counterparty_country=random.choice(["USA", "GBR", "CAN"]),
-                reference=f"REF{random.randint(10000, 99999)}",
-                narrative=random.choice(["Payment", "Deposit", "Withdrawal", "Transfer"]), 
+                channel=txn_channels[txn_index],
+                counterparty_account=f"CP{txn_counterparty_accounts[txn_index]}",
+                counterparty_name=f"CP Name {txn_counterparty_names[txn_index]}",
+                counterparty_bank=f"Bank {txn_counterparty_banks[txn_index]}",
+                counterparty_country=txn_counterparty_countries[txn_index],
+                reference=f"REF{txn_references[txn_index]}",
+                narrative=txn_narratives[txn_index], 
                 processing_date=transaction_date,
-                risk_score=round(random.uniform(0.1, 0.9), 2),
-                is_suspicious=random.choice([True, False]),
-                is_cross_border=random.choice([True, False]),
+                risk_score=txn_risk_scores[txn_index],
+                is_suspicious=txn_is_suspicious[txn_index],
+                is_cross_border=txn_is_cross_border[txn_index],
                 is_high_value=(amount > 1000),
-                ml_prediction=random.choice(["ANOMALY", "NORMAL"]) # Add ML prediction
+                ml_prediction=txn_ml_predictions[txn_index] # Add ML prediction
             )
+            txn_index += 1
             transactions.append(transaction)
             db.add(transaction) # Add transaction to session
     
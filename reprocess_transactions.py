@@ -1,11 +1,14 @@
 import asyncio
 from datetime import datetime, timedelta
+from sqlalchemy import func, tuple_
 from sqlalchemy.orm import Session
 from database import get_db, engine
 from models import Base, Transaction
-from aml_processing import process_transaction_controls
+from aml_processing import process_transaction_controls, risk_engine
 from main import manager # Import the manager from main.py
 
+REPROCESS_BATCH_SIZE = 1000
+
 async def reprocess_recent_transactions():
     print("Starting re-processing of transactions from the last 24 hours...")
     db: Session = next(get_db())
@@ -13,44 +16,65 @@ async def reprocess_recent_transactions():
     try:
         # Calculate the time 24 hours ago
         twenty_four_hours_ago = datetime.utcnow() - timedelta(hours=24)
+        recent_filter = Transaction.created_at >= twenty_four_hours_ago
         
-        # Fetch transactions from the last 24 hours
-        recent_transactions = db.query(Transaction).filter(
-            Transaction.created_at >= twenty_four_hours_ago
-        ).all()
+        transaction_count = db.query(func.count(Transaction.id)).filter(recent_filter).scalar()
+        print(f"Found {transaction_count} transactions to re-process.")
         
-        print(f"Found {len(recent_transactions)} transactions to re-process.")
+        # The status column type is known up front, so pick its serializer once
+        if getattr(Transaction.__table__.c.status.type, 'enum_class', None) is not None:
+            get_status = lambda t: t.status.value if t.status is not None else str(t.status)
+        else:
+            get_status = lambda t: str(t.status)
         
-        for transaction in recent_transactions:
-            print(f"Re-processing transaction: {transaction.id}")
-            # Prepare transaction_data in the format expected by process_transaction_controls
-            transaction_data = {
-                "id": str(transaction.id),
-                "customer_id": transaction.customer_id,
-                "account_number": transaction.account_number,
-                "transaction_type": transaction.transaction_type,
-                "amount": transaction.amount,
-                "base_amount": transaction.base_amount,
-                "currency": transaction.currency,
-                "channel": transaction.channel,
-                "counterparty_account": transaction.counterparty_account,
-                "counterparty_name": transaction.counterparty_name,
-                "counterparty_bank": transaction.counterparty_bank,
-                "reference": transaction.reference,
-                "narrative": transaction.narrative,
-                "processed_by": transaction.processed_by,
-                "status": transaction.status.value if hasattr(transaction.status, 'value') else str(transaction.status)
-            }
+        # Page through the last 24 hours in (created_at, id) order so only one batch is held at a time
+        last_key = None
+        while True:
+            batch_query = db.query(Transaction).filter(recent_filter)
+            if last_key is not None:
+                batch_query = batch_query.filter(tuple_(Transaction.created_at, Transaction.id) > last_key)
+            batch = batch_query.order_by(Transaction.created_at, Transaction.id).limit(REPROCESS_BATCH_SIZE).all()
+            if not batch:
+                break
+            
+            # Taken before processing, since commits expire the loaded rows
+            last_key = (batch[-1].created_at, batch[-1].id)
             
-            # Call process_transaction_controls
-            # Note: process_transaction_controls expects a dict for transaction_data,
-            # and the manager object.
-            await process_transaction_controls(transaction.id, transaction_data, db, manager)
-            print(f"Finished re-processing transaction: {transaction.id}")
+            # Load the batch's 30-day customer averages in one query instead of one per transaction
+            risk_engine.preload_customer_average_amounts(
+                (transaction.customer_id for transaction in batch), db
+            )
             
+            for transaction in batch:
+                print(f"Re-processing transaction: {transaction.id}")
+                # Prepare transaction_data in the format expected by process_transaction_controls
+                transaction_data = {
+                    "id": str(transaction.id),
+                    "customer_id": transaction.customer_id,
+                    "account_number": transaction.account_number,
+                    "transaction_type": transaction.transaction_type,
+                    "amount": transaction.amount,
+                    "base_amount": transaction.base_amount,
+                    "currency": transaction.currency,
+                    "channel": transaction.channel,
+                    "counterparty_account": transaction.counterparty_account,
+                    "counterparty_name": transaction.counterparty_name,
+                    "counterparty_bank": transaction.counterparty_bank,
+                    "reference": transaction.reference,
+                    "narrative": transaction.narrative,
+                    "processed_by": transaction.processed_by,
+                    "status": get_status(transaction)
+                }
+                
+                # Call process_transaction_controls
+                # Note: process_transaction_controls expects a dict for transaction_data,
+                # and the manager object.
+                await process_transaction_controls(transaction.id, transaction_data, db, manager)
+                print(f"Finished re-processing transaction: {transaction.id}")
+        
         db.commit()
         print("Re-processing complete. All changes committed to the database.")
-        
+    
     except Exception as e:
         db.rollback()
         print(f"An error occurred during re-processing: {e}")
@@ -60,4 +84,4 @@ async def reprocess_recent_transactions():
 if __name__ == "__main__":
     # Ensure database tables are created before running
     Base.metadata.create_all(bind=engine)
-    asyncio.run(reprocess_recent_transactions())
\ No newline at end of file
+    asyncio.run(reprocess_recent_transactions())
@@ -3,12 +3,17 @@ Risk Scoring Engine for transaction risk assessment
 """
 
 import logging
-from typing import Dict, Any, List
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, Any, Hashable, Iterable, Optional, Set
 from datetime import datetime, timedelta
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, desc, func
 from models import RiskRating
 
+from config import settings
 from models import Transaction, Customer, Alert
 from utils import calculate_customer_risk_factors
 
@@ -17,6 +22,20 @@ logger = logging.getLogger(__name__)
 class RiskScoringEngine:
     """Comprehensive risk scoring engine for transactions"""
     
+    # Geographic and occupational risk indicators (substring matches)
+    HIGH_RISK_COUNTRIES = frozenset({
+        'IRAN', 'NORTH KOREA', 'SYRIA', 'CUBA', 'AFGHANISTAN',
+        'YEMEN', 'SOMALIA', 'LIBYA', 'IRAQ', 'LEBANON'
+    })
+    MEDIUM_RISK_COUNTRIES = frozenset({
+        'RUSSIA', 'BELARUS', 'MYANMAR', 'VENEZUELA', 'NICARAGUA',
+        'ZIMBABWE', 'ERITREA', 'CENTRAL AFRICAN REPUBLIC'
+    })
+    HIGH_RISK_OCCUPATIONS = frozenset({
+        'POLITICIAN', 'GOVERNMENT', 'CASINO', 'EXCHANGE', 'DEALER',
+        'BROKER', 'ARMS', 'JEWELRY', 'PRECIOUS METALS'
+    })
+    
     def __init__(self):
         self.risk_weights = {
             'amount_risk': 0.25,
@@ -48,17 +67,58 @@ class RiskScoringEngine:
             'SWIFT': 0.8,
             'ZIPIT': 0.5
         }
+        
+        # Keyword sets compiled once for substring matching
+        self._high_risk_country_re = self._compile_keywords(self.HIGH_RISK_COUNTRIES)
+        self._medium_risk_country_re = self._compile_keywords(self.MEDIUM_RISK_COUNTRIES)
+        self._high_risk_occupation_re = self._compile_keywords(self.HIGH_RISK_OCCUPATIONS)
+        
+        # Per-customer caches keyed by (customer_id, day); values are (stored_at, result)
+        self.cache_ttl_seconds = settings.CACHE_TTL_SECONDS
+        self.cache_max_entries = 4096
+        self._pattern_cache = OrderedDict()
+        self._average_amount_cache = OrderedDict()
+    
+    @staticmethod
+    def _compile_keywords(keywords: Iterable[str]) -> "re.Pattern":
+        """Compile keywords into a single alternation matching any of them as a substring"""
+        return re.compile('|'.join(re.escape(keyword) for keyword in sorted(keywords)))
+    
+    def _get_cached(self, cache: OrderedDict, key: Hashable):
+        """Return a cached value, or None if it is missing or expired"""
+        entry = cache.get(key)
+        if entry is None:
+            return None
+        
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.cache_ttl_seconds:
+            del cache[key]
+            return None
+        
+        cache.move_to_end(key)
+        return value
+    
+    def _set_cached(self, cache: OrderedDict, key: Hashable, value):
+        """Store a value, evicting the least recently used entry when full"""
+        cache[key] = (time.monotonic(), value)
+        cache.move_to_end(key)
+        while len(cache) > self.cache_max_entries:
+            cache.popitem(last=False)
     
-    async def calculate_risk_score(self, transaction_data: Dict[str, Any], db: Session) -> float:
+    async def calculate_risk_score(self, transaction_data: Dict[str, Any], db: Session,
+                                   now: Optional[datetime] = None) -> float:
         """Calculate comprehensive risk score for a transaction"""
         try:
+            # Every component and time window is evaluated against the same instant
+            now = now or datetime.now()
+            
             # Calculate individual risk components
-            amount_risk = await self.calculate_amount_risk(transaction_data, db)
-            frequency_risk = await self.calculate_frequency_risk(transaction_data, db)
-            customer_risk = await self.calculate_customer_risk(transaction_data, db)
-            channel_risk = await self.calculate_channel_risk(transaction_data)
-            geographic_risk = await self.calculate_geographic_risk(transaction_data)
-            behavioral_risk = await self.calculate_behavioral_risk(transaction_data, db)
+            amount_risk = await self.calculate_amount_risk(transaction_data, db, now=now)
+            frequency_risk = await self.calculate_frequency_risk(transaction_data, db, now=now)
+            customer_risk = await self.calculate_customer_risk(transaction_data, db, now=now)
+            channel_risk = self.calculate_channel_risk(transaction_data)
+            geographic_risk = self.calculate_geographic_risk(transaction_data)
+            behavioral_risk = await self.calculate_behavioral_risk(transaction_data, db, now=now)
             
             # Calculate weighted risk score
             total_score = (
@@ -84,9 +144,11 @@ class RiskScoringEngine:
             logger.error(f"Error calculating risk score: {e}")
             return 0.5  # Default medium risk
     
-    async def calculate_amount_risk(self, transaction_data: Dict[str, Any], db: Session) -> float:
+    async def calculate_amount_risk(self, transaction_data: Dict[str, Any], db: Session,
+                                    now: Optional[datetime] = None) -> float:
         """Calculate risk based on transaction amount"""
         try:
+            now = now or datetime.now()
             amount = transaction_data.get('base_amount', 0)
             currency = transaction_data.get('currency', 'USD')
             customer_id = transaction_data.get('customer_id')
@@ -105,7 +167,7 @@ class RiskScoringEngine:
                 amount_risk = 0.1
             
             # Adjust based on customer's historical amounts
-            customer_avg = await self.get_customer_average_amount(customer_id, db)
+            customer_avg = await self.get_customer_average_amount(customer_id, db, now=now)
             if customer_avg > 0:
                 ratio = amount / customer_avg
                 if ratio > 10:  # 10x higher than average
@@ -121,13 +183,14 @@ class RiskScoringEngine:
             logger.error(f"Error calculating amount risk: {e}")
             return 0.3
     
-    async def calculate_frequency_risk(self, transaction_data: Dict[str, Any], db: Session) -> float:
+    async def calculate_frequency_risk(self, transaction_data: Dict[str, Any], db: Session,
+                                       now: Optional[datetime] = None) -> float:
         """Calculate risk based on transaction frequency"""
         try:
             customer_id = transaction_data.get('customer_id')
             
             # Count transactions in different time windows
-            now = datetime.now()
+            now = now or datetime.now()
             
             # Transactions in last hour
             txn_1h = db.query(Transaction).filter(
@@ -179,9 +242,11 @@ class RiskScoringEngine:
             logger.error(f"Error calculating frequency risk: {e}")
             return 0.2
     
-    async def calculate_customer_risk(self, transaction_data: Dict[str, Any], db: Session) -> float:
+    async def calculate_customer_risk(self, transaction_data: Dict[str, Any], db: Session,
+                                      now: Optional[datetime] = None) -> float:
         """Calculate risk based on customer profile"""
         try:
+            now = now or datetime.now()
             customer_id = transaction_data.get('customer_id')
             
             customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
@@ -205,22 +270,15 @@ class RiskScoringEngine:
             
             # New customer risk
             if customer.account_opening_date:
-                days_since_opening = (datetime.now() - customer.account_opening_date).days
+                days_since_opening = (now - customer.account_opening_date).days
                 if days_since_opening < 30:  # New customer
                     customer_risk = max(customer_risk, 0.6) # Medium-high risk for new customers
                 elif days_since_opening < 90:  # Recently opened
                     customer_risk = max(customer_risk, 0.3) # Medium risk for recently opened
             
             # High-risk occupations
-            high_risk_occupations = [
-                'POLITICIAN', 'GOVERNMENT', 'CASINO', 'EXCHANGE', 'DEALER',
-                'BROKER', 'ARMS', 'JEWELRY', 'PRECIOUS METALS'
-            ]
-            if customer.occupation:
-                for occupation in high_risk_occupations:
-                    if occupation in customer.occupation.upper():
-                        customer_risk = max(customer_risk, 0.7) # High risk for high-risk occupation
-                        break
+            if customer.occupation and self._high_risk_occupation_re.search(customer.occupation.upper()):
+                customer_risk = max(customer_risk, 0.7) # High risk for high-risk occupation
             
             return min(1.0, customer_risk) # Ensure it doesn't exceed 1.0
             
@@ -228,12 +286,17 @@ class RiskScoringEngine:
             logger.error(f"Error calculating customer risk: {e}")
             return 0.5
     
-    async def calculate_channel_risk(self, transaction_data: Dict[str, Any]) -> float:
+    def calculate_channel_risk(self, transaction_data: Dict[str, Any]) -> float:
         """Calculate risk based on transaction channel"""
         try:
             channel = transaction_data.get('channel', '').upper()
             
-            # Find matching channel risk
+            # Exact channel names are a direct lookup
+            risk = self.channel_risks.get(channel)
+            if risk is not None:
+                return risk
+            
+            # Compound channel strings (e.g. MOBILE_APP) take the first channel name they contain, in dict order
             for channel_pattern, risk in self.channel_risks.items():
                 if channel_pattern in channel:
                     return risk
@@ -245,40 +308,28 @@ class RiskScoringEngine:
             logger.error(f"Error calculating channel risk: {e}")
             return 0.3
     
-    async def calculate_geographic_risk(self, transaction_data: Dict[str, Any]) -> float:
+    def calculate_geographic_risk(self, transaction_data: Dict[str, Any]) -> float:
         """Calculate risk based on geographic factors"""
         try:
             counterparty_bank = transaction_data.get('counterparty_bank', '')
             counterparty_country = transaction_data.get('counterparty_country', '')
             
-            # High-risk countries
-            high_risk_countries = [
-                'IRAN', 'NORTH KOREA', 'SYRIA', 'CUBA', 'AFGHANISTAN',
-                'YEMEN', 'SOMALIA', 'LIBYA', 'IRAQ', 'LEBANON'
-            ]
-            
-            # Medium-risk countries
-            medium_risk_countries = [
-                'RUSSIA', 'BELARUS', 'MYANMAR', 'VENEZUELA', 'NICARAGUA',
-                'ZIMBABWE', 'ERITREA', 'CENTRAL AFRICAN REPUBLIC'
-            ]
-            
             geographic_risk = 0.1  # Default low risk
             
             # Check counterparty country
             if counterparty_country:
                 country_upper = counterparty_country.upper()
-                if any(country in country_upper for country in high_risk_countries):
+                if self._high_risk_country_re.search(country_upper):
                     geographic_risk = 0.9
-                elif any(country in country_upper for country in medium_risk_countries):
+                elif self._medium_risk_country_re.search(country_upper):
                     geographic_risk = 0.6
             
             # Check counterparty bank for geographic indicators
             if counterparty_bank:
                 bank_upper = counterparty_bank.upper()
-                if any(country in bank_upper for country in high_risk_countries):
+                if self._high_risk_country_re.search(bank_upper):
                     geographic_risk = max(geographic_risk, 0.8)
-                elif any(country in bank_upper for country in medium_risk_countries):
+                elif self._medium_risk_country_re.search(bank_upper):
                     geographic_risk = max(geographic_risk, 0.5)
             
             return geographic_risk
@@ -287,12 +338,14 @@ class RiskScoringEngine:
             logger.error(f"Error calculating geographic risk: {e}")
             return 0.2
     
-    async def calculate_behavioral_risk(self, transaction_data: Dict[str, Any], db: Session) -> float:
+    async def calculate_behavioral_risk(self, transaction_data: Dict[str, Any], db: Session,
+                                        now: Optional[datetime] = None) -> float:
         """Calculate risk based on behavioral patterns"""
         try:
             customer_id = transaction_data.get('customer_id')
-            current_hour = datetime.now().hour
-            current_day = datetime.now().weekday()
+            now = now or datetime.now()
+            current_hour = now.hour
+            current_day = now.weekday()
             
             behavioral_risk = 0.0
             
@@ -307,23 +360,23 @@ class RiskScoringEngine:
                 behavioral_risk += 0.2
             
             # Pattern deviation analysis
-            customer_patterns = await self.analyze_customer_patterns(customer_id, db)
+            customer_patterns = await self.analyze_customer_patterns(customer_id, db, now=now)
             
             # Check if current transaction deviates from patterns
             if customer_patterns:
                 # Time pattern deviation
-                usual_hours = customer_patterns.get('usual_hours', [])
+                usual_hours = customer_patterns.get('usual_hours', set())
                 if usual_hours and current_hour not in usual_hours:
                     behavioral_risk += 0.2
                 
                 # Day pattern deviation
-                usual_days = customer_patterns.get('usual_days', [])
+                usual_days = customer_patterns.get('usual_days', set())
                 if usual_days and current_day not in usual_days:
                     behavioral_risk += 0.1
                 
                 # Channel pattern deviation
                 current_channel = transaction_data.get('channel', '')
-                usual_channels = customer_patterns.get('usual_channels', [])
+                usual_channels = customer_patterns.get('usual_channels', set())
                 if usual_channels and current_channel not in usual_channels:
                     behavioral_risk += 0.15
             
@@ -331,7 +384,7 @@ class RiskScoringEngine:
             recent_alerts = db.query(Alert).join(Transaction).filter(
                 and_(
                     Transaction.customer_id == customer_id,
-                    Alert.created_at >= datetime.now() - timedelta(days=30)
+                    Alert.created_at >= now - timedelta(days=30)
                 )
             ).count()
             
@@ -344,10 +397,17 @@ class RiskScoringEngine:
             logger.error(f"Error calculating behavioral risk: {e}")
             return 0.2
     
-    async def get_customer_average_amount(self, customer_id: str, db: Session) -> float:
+    async def get_customer_average_amount(self, customer_id: str, db: Session,
+                                          now: Optional[datetime] = None) -> float:
         """Get customer's average transaction amount"""
         try:
-            thirty_days_ago = datetime.now() - timedelta(days=30)
+            now = now or datetime.now()
+            cache_key = (customer_id, now.date())
+            cached = self._get_cached(self._average_amount_cache, cache_key)
+            if cached is not None:
+                return cached
+            
+            thirty_days_ago = now - timedelta(days=30)
             
             result = db.query(func.avg(Transaction.base_amount)).filter(
                 and_(
@@ -356,12 +416,43 @@ class RiskScoringEngine:
                 )
             ).scalar()
             
-            return float(result) if result else 0.0
+            average_amount = float(result) if result else 0.0
+            self._set_cached(self._average_amount_cache, cache_key, average_amount)
+            return average_amount
             
         except Exception as e:
             logger.error(f"Error calculating customer average amount: {e}")
             return 0.0
 
+    def preload_customer_average_amounts(self, customer_ids: Iterable[str], db: Session,
+                                         now: Optional[datetime] = None) -> int:
+        """Warm the average-amount cache for many customers with one grouped query"""
+        try:
+            customer_ids = list(set(customer_ids))
+            if not customer_ids:
+                return 0
+            
+            now = now or datetime.now()
+            thirty_days_ago = now - timedelta(days=30)
+            
+            averages = dict(db.query(Transaction.customer_id, func.avg(Transaction.base_amount)).filter(
+                and_(
+                    Transaction.customer_id.in_(customer_ids),
+                    Transaction.created_at >= thirty_days_ago
+                )
+            ).group_by(Transaction.customer_id).all())
+            
+            today = now.date()
+            for customer_id in customer_ids:
+                average = averages.get(customer_id)
+                self._set_cached(self._average_amount_cache, (customer_id, today), float(average) if average else 0.0)
+            
+            return len(customer_ids)
+            
+        except Exception as e:
+            logger.error(f"Error preloading customer average amounts: {e}")
+            return 0
+
     async def update_customer_overall_risk_rating(self, customer_id: str, db: Session):
         """Calculate and update a customer's overall risk rating based on recent activity and alerts."""
         try:
@@ -378,41 +469,50 @@ class RiskScoringEngine:
             overall_risk_score = 0.0
             contributing_factors = []
 
-            # Factor 1: Average risk score of recent transactions (e.g., last 30 days)
+            # All three factors are aggregated server-side in a single round trip
             thirty_days_ago = datetime.now() - timedelta(days=30)
-            recent_transactions = db.query(Transaction.risk_score).filter(
+
+            # Factor 1: Average risk score of recent transactions (e.g., last 30 days)
+            avg_txn_risk_query = db.query(func.avg(Transaction.risk_score)).filter(
                 and_(
                     Transaction.customer_id == customer_id,
                     Transaction.created_at >= thirty_days_ago
                 )
-            ).all()
-
-            if recent_transactions:
-                avg_txn_risk = sum([t.risk_score for t in recent_transactions]) / len(recent_transactions)
-                overall_risk_score += avg_txn_risk * 0.5  # Adjusted weight for average transaction risk
-                contributing_factors.append(f"Avg Txn Risk: {avg_txn_risk:.2f}")
+            ).scalar_subquery()
 
             # Factor 2: Highest risk score of any active alerts
-            active_alerts = db.query(Alert).join(Transaction).filter(
+            max_alert_risk_query = db.query(func.max(Alert.risk_score)).join(Transaction).filter(
                 and_(
                     Transaction.customer_id == customer_id,
                     Alert.status.in_(['OPEN', 'INVESTIGATING'])
                 )
-            ).all()
-
-            if active_alerts:
-                max_alert_risk = max([alert.risk_score for alert in active_alerts])
-                overall_risk_score += max_alert_risk * 0.5  # Adjusted weight for highest alert risk
-                contributing_factors.append(f"Max Alert Risk: {max_alert_risk:.2f}")
+            ).scalar_subquery()
 
             # Factor 3: Number of recent alerts (e.g., last 30 days)
-            recent_alerts_count = db.query(Alert).join(Transaction).filter(
+            recent_alerts_query = db.query(func.count(Alert.id)).join(Transaction).filter(
                 and_(
                     Transaction.customer_id == customer_id,
                     Alert.created_at >= thirty_days_ago
                 )
-            ).count()
+            ).scalar_subquery()
 
+            risk_factors = db.query(
+                avg_txn_risk_query.label('avg_txn_risk'),
+                max_alert_risk_query.label('max_alert_risk'),
+                recent_alerts_query.label('recent_alerts_count')
+            ).one()
+
+            if risk_factors.avg_txn_risk is not None:
+                avg_txn_risk = float(risk_factors.avg_txn_risk)
+                overall_risk_score += avg_txn_risk * 0.5  # Adjusted weight for average transaction risk
+                contributing_factors.append(f"Avg Txn Risk: {avg_txn_risk:.2f}")
+
+            if risk_factors.max_alert_risk is not None:
+                max_alert_risk = float(risk_factors.max_alert_risk)
+                overall_risk_score += max_alert_risk * 0.5  # Adjusted weight for highest alert risk
+                contributing_factors.append(f"Max Alert Risk: {max_alert_risk:.2f}")
+
+            recent_alerts_count = risk_factors.recent_alerts_count or 0
             if recent_alerts_count > 0:
                 overall_risk_score += min(0.3, recent_alerts_count * 0.1) # Increased contribution per alert, capped
                 contributing_factors.append(f"Recent Alerts: {recent_alerts_count}")
@@ -435,12 +535,19 @@ class RiskScoringEngine:
         except Exception as e:
             logger.error(f"Error updating customer overall risk rating for {customer_id}: {e}")
 
-    async def analyze_customer_patterns(self, customer_id: str, db: Session) -> Dict[str, List]:
+    async def analyze_customer_patterns(self, customer_id: str, db: Session,
+                                        now: Optional[datetime] = None) -> Dict[str, Set]:
         """Analyze customer's transaction patterns"""
         try:
-            sixty_days_ago = datetime.now() - timedelta(days=60)
+            now = now or datetime.now()
+            cache_key = (customer_id, now.date())
+            cached = self._get_cached(self._pattern_cache, cache_key)
+            if cached is not None:
+                return cached
+            
+            sixty_days_ago = now - timedelta(days=60)
             
-            transactions = db.query(Transaction).filter(
+            transactions = db.query(Transaction.created_at, Transaction.channel).filter(
                 and_(
                     Transaction.customer_id == customer_id,
                     Transaction.created_at >= sixty_days_ago
@@ -448,25 +555,29 @@ class RiskScoringEngine:
             ).all()
             
             if len(transactions) < 5:  # Need minimum transactions for pattern analysis
+                self._set_cached(self._pattern_cache, cache_key, {})
                 return {}
             
             # Analyze patterns
-            hours = [t.created_at.hour for t in transactions]
-            days = [t.created_at.weekday() for t in transactions]
-            channels = [t.channel for t in transactions]
+            count = len(transactions)
+            hours = np.fromiter((created_at.hour for created_at, _ in transactions), dtype=np.int8, count=count)
+            days = np.fromiter((created_at.weekday() for created_at, _ in transactions), dtype=np.int8, count=count)
+            channel_counts = Counter(channel for _, channel in transactions)
             
             # Find most common patterns (appearing in at least 30% of transactions)
-            threshold = len(transactions) * 0.3
+            threshold = count * 0.3
             
-            usual_hours = [h for h in set(hours) if hours.count(h) >= threshold]
-            usual_days = [d for d in set(days) if days.count(d) >= threshold]
-            usual_channels = [c for c in set(channels) if channels.count(c) >= threshold]
+            usual_hours = set(np.flatnonzero(np.bincount(hours, minlength=24) >= threshold).tolist())
+            usual_days = set(np.flatnonzero(np.bincount(days, minlength=7) >= threshold).tolist())
+            usual_channels = {c for c, n in channel_counts.items() if n >= threshold}
             
-            return {
+            patterns = {
                 'usual_hours': usual_hours,
                 'usual_days': usual_days,
                 'usual_channels': usual_channels
             }
+            self._set_cached(self._pattern_cache, cache_key, patterns)
+            return patterns
             
         except Exception as e:
             logger.error(f"Error analyzing customer patterns: {e}")
@@ -1,46 +1,58 @@
 import sqlalchemy
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import create_engine
 from config import settings
 
+# (table, column) -> DDL run when the column is missing
+COLUMN_MIGRATIONS = [
+    ('transactions', 'status', "ALTER TABLE transactions ADD COLUMN status VARCHAR(255) NOT NULL DEFAULT 'PENDING'"),
+    ('transactions', 'processing_status', "ALTER TABLE transactions ADD COLUMN processing_status VARCHAR(255)"),
+    ('customers', 'status', "ALTER TABLE customers ADD COLUMN status VARCHAR(255) DEFAULT 'active'"),
+    ('customers', 'is_staff', "ALTER TABLE customers ADD COLUMN is_staff BOOLEAN DEFAULT FALSE"),
+]
+
 def run_migration():
     engine = create_engine(settings.DATABASE_URL)
-    inspector = inspect(engine)
-    
-    # For transactions table
-    trans_columns = [col['name'] for col in inspector.get_columns('transactions')]
-    
+
+    # Fetch the existing columns and indexes on one connection instead of reflecting through inspect()
     with engine.connect() as connection:
-        if 'status' not in trans_columns:
-            print("Adding 'status' column to 'transactions' table...")
-            connection.execute(sqlalchemy.text("ALTER TABLE transactions ADD COLUMN status VARCHAR(255) NOT NULL DEFAULT 'PENDING'"))
-            print("Column 'status' added.")
-        else:
-            print("Column 'status' already exists in 'transactions'.")
-            
-        if 'processing_status' not in trans_columns:
-            print("Adding 'processing_status' column to 'transactions' table...")
-            connection.execute(sqlalchemy.text("ALTER TABLE transactions ADD COLUMN processing_status VARCHAR(255)"))
-            print("Column 'processing_status' added.")
-        else:
-            print("Column 'processing_status' already exists in 'transactions'.")
+        existing_columns = {
+            (row.table_name, row.column_name)
+            for row in connection.execute(sqlalchemy.text(
+                "SELECT table_name AS table_name, column_name AS column_name "
+                "FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name IN ('transactions', 'customers')"
+            ))
+        }
+        trans_indexes = {
+            row.index_name
+            for row in connection.execute(sqlalchemy.text(
+                "SELECT DISTINCT index_name AS index_name "
+                "FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'transactions'"
+            ))
+        }
 
-    # For customers table
-    cust_columns = [col['name'] for col in inspector.get_columns('customers')]
+    with engine.begin() as connection:
+        for table, column, ddl in COLUMN_MIGRATIONS:
+            if (table, column) not in existing_columns:
+                print(f"Adding '{column}' column to '{table}' table...")
+                connection.execute(sqlalchemy.text(ddl))
+                print(f"Column '{column}' added.")
+            else:
+                print(f"Column '{column}' already exists in '{table}'.")
 
+    # Composite index for per-customer time-window scans
     with engine.connect() as connection:
-        if 'status' not in cust_columns:
-            print("Adding 'status' column to 'customers' table...")
-            connection.execute(sqlalchemy.text("ALTER TABLE customers ADD COLUMN status VARCHAR(255) DEFAULT 'active'"))
-            print("Column 'status' added.")
-        else:
-            print("Column 'status' already exists in 'customers'.")
-
-        if 'is_staff' not in cust_columns:
-            print("Adding 'is_staff' column to 'customers' table...")
-            connection.execute(sqlalchemy.text("ALTER TABLE customers ADD COLUMN is_staff BOOLEAN DEFAULT FALSE"))
-            print("Column 'is_staff' added.")
+        if 'ix_txn_customer_created' not in trans_indexes:
+            print("Creating index 'ix_txn_customer_created' on 'transactions'...")
+            # Build online so inserts into transactions are not blocked while the index is created
+            connection.execute(sqlalchemy.text(
+                "CREATE INDEX ix_txn_customer_created ON transactions (customer_id, created_at DESC) "
+                "ALGORITHM=INPLACE LOCK=NONE"
+            ))
+            print("Index 'ix_txn_customer_created' created.")
         else:
-            print("Column 'is_staff' already exists in 'customers'.")
+            print("Index 'ix_txn_customer_created' already exists on 'transactions'.")
 
 
 if __name__ == "__main__":
@@ -1,36 +1,157 @@
 import csv
 import io
 import logging
-from typing import List, Dict, Any, Optional
+import time
+import unicodedata
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from models import SanctionsList, PEPList
 
 logger = logging.getLogger(__name__)
 
+# Sanctions and PEP rows shared by every engine instance so screening never hits the database
+SCREENING_CACHE_TTL_SECONDS = 300
+_screening_cache: Dict[str, Any] = {
+    "sanctions": None,
+    "peps": None,
+    "loaded_at": 0.0
+}
+
+def invalidate_screening_cache():
+    """Force the next screening call to reload the sanctions and PEP lists"""
+    _screening_cache["sanctions"] = None
+    _screening_cache["peps"] = None
+    _screening_cache["loaded_at"] = 0.0
+
+_SEGMENT_SEPARATOR = "\x00"
+
+def _fold_text(text: str) -> str:
+    """Case- and accent-insensitive form of text, so "Jose" matches "José" as the database collation did"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def _as_alias_list(aliases: Any) -> List[str]:
+    """Normalize the JSON aliases column to a list of strings"""
+    if not aliases:
+        return []
+    if isinstance(aliases, str):
+        return [aliases]
+    return [str(alias) for alias in aliases if alias]
+
+def _build_screening_index(entries: List[Dict[str, Any]], name_field: str, country_field: str) -> Dict[str, Any]:
+    """
+    Flatten every folded name and alias into one separator-joined string with a
+    parallel owner array, so a query is located with a single scan instead of a
+    Python loop over entries and their aliases.
+    """
+    segments = []
+    owners = []
+    for position, entry in enumerate(entries):
+        for name in [entry[name_field] or "", *entry["aliases"]]:
+            segments.append(_fold_text(name))
+            owners.append(position)
+
+    offsets = []
+    offset = 0
+    for segment in segments:
+        offsets.append(offset)
+        offset += len(segment) + len(_SEGMENT_SEPARATOR)
+
+    return {
+        "entries": entries,
+        "haystack": _SEGMENT_SEPARATOR.join(segments),
+        "offsets": offsets,
+        "owners": owners,
+        "countries": [_fold_text(entry[country_field] or "") for entry in entries],
+        "max_length": max((len(segment) for segment in segments), default=0)
+    }
+
 class SanctionsScreeningEngine:
     def __init__(self):
         pass
 
-    async def screen_transaction(self, transaction_data: Dict[str, Any], db: Session) -> Dict[str, Any]:
-        logger.info(f"[SanctionsScreeningEngine] screen_transaction called with data: {transaction_data}")
+    def _load_screening_lists(self, db: Session) -> Dict[str, Any]:
+        """Load sanctions and PEP rows into the shared in-memory cache"""
+        sanctions = [
+            {
+                "id": row.id,
+                "entity_name": row.entity_name,
+                "entity_type": row.entity_type,
+                "aliases": _as_alias_list(row.aliases),
+                "nationality": row.nationality,
+                "program": row.program,
+                "date_of_birth": row.date_of_birth
+            }
+            for row in db.query(
+                SanctionsList.id,
+                SanctionsList.entity_name,
+                SanctionsList.entity_type,
+                SanctionsList.aliases,
+                SanctionsList.nationality,
+                SanctionsList.program,
+                SanctionsList.date_of_birth
+            )
+        ]
+        peps = [
+            {
+                "id": row.id,
+                "full_name": row.full_name,
+                "aliases": _as_alias_list(row.aliases),
+                "country": row.country
+            }
+            for row in db.query(PEPList.id, PEPList.full_name, PEPList.aliases, PEPList.country)
+        ]
+
+        _screening_cache["sanctions"] = _build_screening_index(sanctions, "entity_name", "nationality")
+        _screening_cache["peps"] = _build_screening_index(peps, "full_name", "country")
+        _screening_cache["loaded_at"] = time.monotonic()
+        logger.info(f"[SanctionsScreeningEngine] Loaded {len(sanctions)} sanctions and {len(peps)} PEP entries into cache.")
+        return _screening_cache
+
+    def _get_screening_lists(self, db: Session) -> Dict[str, Any]:
+        """Return the cached screening lists, reloading them when stale or invalidated"""
+        if (_screening_cache["sanctions"] is None
+                or time.monotonic() - _screening_cache["loaded_at"] > SCREENING_CACHE_TTL_SECONDS):
+            return self._load_screening_lists(db)
+        return _screening_cache
+
+    async def update_sanctions_lists(self, db: Session):
+        """Reload the in-memory sanctions and PEP lists from the database"""
+        invalidate_screening_cache()
+        self._load_screening_lists(db)
+
+    @staticmethod
+    def _matching_indexes(index: Dict[str, Any], name_query: str, country_query: Optional[str]) -> List[int]:
         """
-        Screens a transaction's counterparty against sanctions and PEP lists from the database.
+        Positions of entries whose name or any alias contains name_query and, when a
+        country is given, whose country contains country_query (all folded with _fold_text).
+        Entries without a country never match a country filter.
         """
-        counterparty_name = transaction_data.get("counterparty_name")
-        counterparty_country = transaction_data.get("counterparty_country")
+        # A name longer than every listed name or alias cannot be a substring of any of them
+        if not name_query or len(name_query) > index["max_length"] or _SEGMENT_SEPARATOR in name_query:
+            return []
 
-        if not counterparty_name:
-            logger.warning("[SanctionsScreeningEngine] No counterparty name provided.")
-            return {
-                "matched": False,
-                "matches": [],
-                "pep_matches": [],
-                "adverse_media_hits": [],
-                "risk_score": 0.0,
-                "details": "No counterparty name provided for screening."
-            }
+        haystack, offsets, owners = index["haystack"], index["offsets"], index["owners"]
+        matches = set()
+        position = haystack.find(name_query)
+        while position != -1:
+            segment = bisect_right(offsets, position) - 1
+            matches.add(owners[segment])
+            # Continue from the next segment; one hit per name or alias is enough
+            if segment + 1 >= len(offsets):
+                break
+            position = haystack.find(name_query, offsets[segment + 1])
+
+        countries = index["countries"]
+        return sorted(
+            i for i in matches
+            if not country_query or country_query in countries[i]
+        )
 
+    def _build_screening_result(self, counterparty_name: str, screening_lists: Dict[str, Any],
+                                sanctions_hits: List[int], pep_hits: List[int]) -> Dict[str, Any]:
+        """Format matched sanctions and PEP entries into a screening result"""
         matched = False
         sanctions_matches = []
         pep_matches = []
@@ -39,51 +160,37 @@ class SanctionsScreeningEngine:
         details = ""
 
         # Search in SanctionsList
-        sanctions_query = db.query(SanctionsList).filter(
-            or_(
-                SanctionsList.entity_name.ilike(f"%{counterparty_name}%"),
-                SanctionsList.aliases.ilike(f"%{counterparty_name}%")
-            )
-        )
-        if counterparty_country:
-            sanctions_query = sanctions_query.filter(SanctionsList.nationality.ilike(f"%{counterparty_country}%"))
-
-        for entry in sanctions_query.all():
+        sanctions_index = screening_lists["sanctions"]
+        for i in sanctions_hits:
+            entry = sanctions_index["entries"][i]
             matched = True
             sanctions_matches.append({
-                "matched_name": entry.entity_name,
-                "entity_type": entry.entity_type,
-                "similarity_score": 0.9 # Using a fixed score for ilike match
+                "matched_name": entry["entity_name"],
+                "entity_type": entry["entity_type"],
+                "similarity_score": 0.9 # Using a fixed score for substring match
             })
             risk_score = max(risk_score, 0.9)
-            details += f"Sanctioned match: {entry.entity_name}. "
+            details += f"Sanctioned match: {entry['entity_name']}. "
 
         # Search in PEPList
-        pep_query = db.query(PEPList).filter(
-            or_(
-                PEPList.full_name.ilike(f"%{counterparty_name}%"),
-                PEPList.aliases.ilike(f"%{counterparty_name}%")
-            )
-        )
-        if counterparty_country:
-            pep_query = pep_query.filter(PEPList.country.ilike(f"%{counterparty_country}%"))
-        
-        for entry in pep_query.all():
+        pep_index = screening_lists["peps"]
+        for i in pep_hits:
+            entry = pep_index["entries"][i]
             matched = True
             pep_matches.append({
-                "matched_name": entry.full_name,
+                "matched_name": entry["full_name"],
                 "entity_type": "PEP",
-                "similarity_score": 0.9 # Using a fixed score for ilike match
+                "similarity_score": 0.9 # Using a fixed score for substring match
             })
             risk_score = max(risk_score, 0.7)
-            details += f"PEP match: {entry.full_name}. "
+            details += f"PEP match: {entry['full_name']}. "
 
         # Adverse media hits would require an external service, so we'll leave it empty for now.
-        
+
         if not matched:
             details = f"No sanctions, PEP, or adverse media matches found for {counterparty_name}."
 
-        final_result = {
+        return {
             "matched": matched,
             "matches": sanctions_matches,
             "pep_matches": pep_matches,
@@ -91,5 +198,71 @@ class SanctionsScreeningEngine:
             "risk_score": risk_score,
             "details": details.strip()
         }
+
+    @staticmethod
+    def _empty_screening_result() -> Dict[str, Any]:
+        return {
+            "matched": False,
+            "matches": [],
+            "pep_matches": [],
+            "adverse_media_hits": [],
+            "risk_score": 0.0,
+            "details": "No counterparty name provided for screening."
+        }
+
+    async def screen_transaction(self, transaction_data: Dict[str, Any], db: Session) -> Dict[str, Any]:
+        logger.info(f"[SanctionsScreeningEngine] screen_transaction called with data: {transaction_data}")
+        """
+        Screens a transaction's counterparty against the cached sanctions and PEP lists.
+        """
+        counterparty_name = transaction_data.get("counterparty_name")
+        counterparty_country = transaction_data.get("counterparty_country")
+
+        if not counterparty_name:
+            logger.warning("[SanctionsScreeningEngine] No counterparty name provided.")
+            return self._empty_screening_result()
+
+        screening_lists = self._get_screening_lists(db)
+        name_query = _fold_text(counterparty_name)
+        country_query = _fold_text(counterparty_country) if counterparty_country else None
+
+        final_result = self._build_screening_result(
+            counterparty_name,
+            screening_lists,
+            self._matching_indexes(screening_lists["sanctions"], name_query, country_query),
+            self._matching_indexes(screening_lists["peps"], name_query, country_query)
+        )
         logger.info(f"[SanctionsScreeningEngine] Returning result: {final_result}")
         return final_result
+
+    async def screen_batch(self, transactions: List[Dict[str, Any]], db: Session) -> List[Dict[str, Any]]:
+        """
+        Screens many transactions' counterparties in one pass. Each distinct
+        (name, country) pair is matched once and the result shared by every
+        transaction that carries it. Results are returned in input order.
+        """
+        screening_lists = self._get_screening_lists(db)
+        hits_by_query: Dict[Tuple[str, Optional[str]], Tuple[List[int], List[int]]] = {}
+        results = []
+
+        for transaction_data in transactions:
+            counterparty_name = transaction_data.get("counterparty_name")
+            counterparty_country = transaction_data.get("counterparty_country")
+            if not counterparty_name:
+                results.append(self._empty_screening_result())
+                continue
+
+            query = (_fold_text(counterparty_name), _fold_text(counterparty_country) if counterparty_country else None)
+            hits = hits_by_query.get(query)
+            if hits is None:
+                hits = (
+                    self._matching_indexes(screening_lists["sanctions"], *query),
+                    self._matching_indexes(screening_lists["peps"], *query)
+                )
+                hits_by_query[query] = hits
+
+            results.append(self._build_screening_result(counterparty_name, screening_lists, *hits))
+
+        logger.info(f"[SanctionsScreeningEngine] Screened {len(transactions)} transactions "
+                    f"({len(hits_by_query)} distinct counterparties).")
+        return results
@@ -6,16 +6,36 @@ import logging
 import hashlib
 import re
 import uuid
-from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Set, Tuple
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, or_, func, desc, case, extract
 
 from models import Transaction, Customer, Alert
 
 logger = logging.getLogger(__name__)
 
+# Patterns compiled once at import for the validators and sanitizers below
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_NON_DIGIT_RE = re.compile(r'\D')
+_AMT_STRIP_RE = re.compile(r'[^\d.,\-]')
+_HTML_RE = re.compile(r'<[^>]+>')
+_JS_RE = re.compile(r'javascript:', re.IGNORECASE)
+_VBS_RE = re.compile(r'vbscript:', re.IGNORECASE)
+_ONEVT_RE = re.compile(r'on\w+\s*=', re.IGNORECASE)
+# Country code + check digits; bank (4) + country (2) + location (2) + optional branch (3)
+_IBAN_PREFIX_RE = re.compile(r'[A-Z]{2}[0-9]{2}')
+_SWIFT_RE = re.compile(r'[A-Z]{6}[A-Z0-9]{2}(?:[A-Z0-9]{3})?')
+
+# Honorifics and generational suffixes dropped by standardize_name
+_NAME_PREFIXES = frozenset(['MR', 'MRS', 'MS', 'DR', 'PROF', 'REV'])
+_NAME_SUFFIXES = frozenset(['JR', 'SR', 'III', 'IV', 'PhD', 'MD'])
+
+# Validators and name standardization are pure, so repeated values during screening are memoized
+_VALIDATION_CACHE_SIZE = 2 ** 16
+
 def generate_transaction_id() -> str:
     """Generate unique transaction ID"""
     return f"TXN-{datetime.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
@@ -30,30 +50,43 @@ def hash_sensitive_data(data: str) -> str:
         return ""
     return hashlib.sha256(data.encode()).hexdigest()
 
+def hash_sensitive_data_batch(values: List[str]) -> List[str]:
+    """Hash many sensitive values for storage, e.g. during KYC or counterparty import"""
+    sha256 = hashlib.sha256
+    return [sha256(value.encode()).hexdigest() if value else "" for value in values]
+
+# Masks for the usual account and ID lengths, built once
+_STARS = tuple("*" * i for i in range(40))
+
+def _stars(count: int) -> str:
+    return _STARS[count] if count < len(_STARS) else "*" * count
+
 def mask_account_number(account_number: str) -> str:
     """Mask account number for display"""
     if not account_number or len(account_number) < 4:
         return account_number
-    return "*" * (len(account_number) - 4) + account_number[-4:]
+    return _stars(len(account_number) - 4) + account_number[-4:]
 
 def mask_id_number(id_number: str) -> str:
     """Mask ID number for display"""
     if not id_number or len(id_number) < 4:
         return id_number
-    return id_number[:2] + "*" * (len(id_number) - 4) + id_number[-2:]
+    return id_number[:2] + _stars(len(id_number) - 4) + id_number[-2:]
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_email(email: str) -> bool:
     """Validate email address format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_phone_number(phone: str) -> bool:
     """Validate phone number format"""
     # Remove all non-digit characters
-    digits_only = re.sub(r'\D', '', phone)
+    digits_only = _NON_DIGIT_RE.sub('', phone)
     # Check if it's between 7 and 15 digits
     return 7 <= len(digits_only) <= 15
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def standardize_name(name: str) -> str:
     """Standardize name for comparison"""
     if not name:
@@ -63,27 +96,23 @@ def standardize_name(name: str) -> str:
     standardized = ' '.join(name.upper().split())
     
     # Remove common prefixes and suffixes
-    prefixes = ['MR', 'MRS', 'MS', 'DR', 'PROF', 'REV']
-    suffixes = ['JR', 'SR', 'III', 'IV', 'PhD', 'MD']
-    
     words = standardized.split()
     
     # Remove prefixes
-    if words and words[0] in prefixes:
+    if words and words[0] in _NAME_PREFIXES:
         words = words[1:]
     
     # Remove suffixes
-    if words and words[-1] in suffixes:
+    if words and words[-1] in _NAME_SUFFIXES:
         words = words[:-1]
     
     return ' '.join(words)
 
-def calculate_age(date_of_birth: datetime) -> int:
-    """Calculate age from date of birth"""
-    if not date_of_birth:
-        return 0
-    
-    today = datetime.now()
+def _as_date(value: datetime) -> date:
+    return value.date() if isinstance(value, datetime) else value
+
+@lru_cache(maxsize=4096)
+def _age_on(date_of_birth: date, today: date) -> int:
     age = today.year - date_of_birth.year
     
     # Adjust if birthday hasn't occurred this year
@@ -92,27 +121,45 @@ def calculate_age(date_of_birth: datetime) -> int:
     
     return age
 
+def calculate_age(date_of_birth: datetime, now: Optional[datetime] = None) -> int:
+    """Calculate age from date of birth"""
+    if not date_of_birth:
+        return 0
+    
+    # Keyed on dates, so a new day simply misses the cache
+    return _age_on(_as_date(date_of_birth), _as_date(now or datetime.now()))
+
+_CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'ZWL': 'Z$',
+    'ZAR': 'R',
+    'EUR': '€',
+    'GBP': '£',
+    'JPY': '¥',
+    'CNY': '¥',
+    'AUD': 'A$',
+    'CAD': 'C$',
+    'CHF': 'Fr'
+}
+
+def _currency_formatter(symbol: str, decimals: int):
+    """Formatter with the symbol and precision fixed up front"""
+    spec = f",.{decimals}f"
+    return lambda amount: symbol + format(amount, spec)
+
+# Formatter per known currency; JPY has no minor unit
+_CURRENCY_FMT = {
+    currency: _currency_formatter(symbol, 0 if currency == 'JPY' else 2)
+    for currency, symbol in _CURRENCY_SYMBOLS.items()
+}
+
 def format_currency(amount: float, currency: str = "USD") -> str:
     """Format currency amount for display"""
-    currency_symbols = {
-        'USD': '$',
-        'ZWL': 'Z$',
-        'ZAR': 'R',
-        'EUR': '€',
-        'GBP': '£',
-        'JPY': '¥',
-        'CNY': '¥',
-        'AUD': 'A$',
-        'CAD': 'C$',
-        'CHF': 'Fr'
-    }
-    
-    symbol = currency_symbols.get(currency, currency)
-    
-    if currency in ['JPY']:
-        return f"{symbol}{amount:,.0f}"
-    else:
-        return f"{symbol}{amount:,.2f}"
+    formatter = _CURRENCY_FMT.get(currency)
+    if formatter is None:
+        # Unknown currencies are shown with their code as the symbol
+        return f"{currency}{amount:,.2f}"
+    return formatter(amount)
 
 def parse_amount(amount_str: str) -> Optional[float]:
     """Parse amount string to float"""
@@ -120,7 +167,7 @@ def parse_amount(amount_str: str) -> Optional[float]:
         return None
     
     # Remove currency symbols and spaces
-    cleaned = re.sub(r'[^\d.,\-]', '', str(amount_str))
+    cleaned = _AMT_STRIP_RE.sub('', str(amount_str))
     
     try:
         # Handle different decimal separators
@@ -138,10 +185,10 @@ def parse_amount(amount_str: str) -> Optional[float]:
         logger.error(f"Could not parse amount: {amount_str}")
         return None
 
-def calculate_transaction_velocity(customer_id: str, hours: int, db: Session) -> float:
+def calculate_transaction_velocity(customer_id: str, hours: int, db: Session, now: Optional[datetime] = None) -> float:
     """Calculate transaction velocity for a customer"""
     try:
-        start_time = datetime.now() - timedelta(hours=hours)
+        start_time = (now or datetime.now()) - timedelta(hours=hours)
         
         transaction_count = db.query(Transaction).filter(
             and_(
@@ -156,10 +203,38 @@ def calculate_transaction_velocity(customer_id: str, hours: int, db: Session) ->
         logger.error(f"Error calculating transaction velocity: {e}")
         return 0.0
 
-def get_customer_transaction_history(customer_id: str, days: int, db: Session) -> List[Transaction]:
+def _window_count_column(cutoff: datetime, label: str):
+    """Aggregate column counting transactions created at or after cutoff"""
+    return func.sum(case((Transaction.created_at >= cutoff, 1), else_=0)).label(label)
+
+def get_transaction_velocities(customer_id: str, windows_hours: List[int], db: Session,
+                               now: Optional[datetime] = None) -> Dict[int, float]:
+    """Calculate transaction velocity for several windows with a single query"""
+    try:
+        now = now or datetime.now()
+        cutoffs = {hours: now - timedelta(hours=hours) for hours in windows_hours}
+        
+        counts = db.query(*[
+            _window_count_column(cutoff, f"c{hours}") for hours, cutoff in cutoffs.items()
+        ]).filter(
+            and_(
+                Transaction.customer_id == customer_id,
+                Transaction.created_at >= min(cutoffs.values())
+            )
+        ).one()
+        
+        # SUM comes back as Decimal on MySQL
+        return {hours: int(count or 0) / hours for hours, count in zip(cutoffs, counts)}
+        
+    except Exception as e:
+        logger.error(f"Error calculating transaction velocities: {e}")
+        return {hours: 0.0 for hours in windows_hours}
+
+def get_customer_transaction_history(customer_id: str, days: int, db: Session,
+                                     now: Optional[datetime] = None) -> List[Transaction]:
     """Get customer transaction history"""
     try:
-        start_date = datetime.now() - timedelta(days=days)
+        start_date = (now or datetime.now()) - timedelta(days=days)
         
         transactions = db.query(Transaction).filter(
             and_(
@@ -174,66 +249,119 @@ def get_customer_transaction_history(customer_id: str, days: int, db: Session) -
         logger.error(f"Error getting customer transaction history: {e}")
         return []
 
-def calculate_customer_risk_factors(customer_id: str, db: Session) -> Dict[str, Any]:
-    """Calculate various risk factors for a customer"""
+def get_customer_tx_columns(customer_id: str, days: int, db: Session,
+                            columns: Tuple = (Transaction.base_amount, Transaction.channel, Transaction.created_at),
+                            now: Optional[datetime] = None) -> List[Tuple]:
+    """Get selected columns of a customer's recent transactions as row tuples, without building Transaction objects"""
     try:
-        customer = db.query(Customer).filter(Customer.customer_id == customer_id).first()
-        if not customer:
-            return {}
+        start_date = (now or datetime.now()) - timedelta(days=days)
         
-        # Recent transaction analysis
-        recent_transactions = get_customer_transaction_history(customer_id, 30, db)
+        return db.query(*columns).filter(
+            and_(
+                Transaction.customer_id == customer_id,
+                Transaction.created_at >= start_date
+            )
+        ).order_by(desc(Transaction.created_at)).all()
         
-        # Calculate metrics
-        total_volume = sum(t.base_amount for t in recent_transactions)
-        avg_transaction = total_volume / len(recent_transactions) if recent_transactions else 0
-        max_transaction = max(t.base_amount for t in recent_transactions) if recent_transactions else 0
+    except Exception as e:
+        logger.error(f"Error getting customer transaction columns: {e}")
+        return []
+
+def calculate_customer_risk_factors(customer_id: str, db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Calculate various risk factors for a customer"""
+    return calculate_customer_risk_factors_bulk([customer_id], db, now=now).get(customer_id, {})
+
+def calculate_customer_risk_factors_bulk(customer_ids: List[str], db: Session,
+                                         now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+    """Calculate risk factors for many customers, keyed by customer_id, with one grouped query per table"""
+    try:
+        if not customer_ids:
+            return {}
         
-        # Velocity metrics
-        velocity_24h = calculate_transaction_velocity(customer_id, 24, db)
-        velocity_7d = calculate_transaction_velocity(customer_id, 168, db)  # 7 days in hours
+        customers = db.query(Customer).filter(Customer.customer_id.in_(customer_ids)).all()
+        if not customers:
+            return {}
         
-        # Channel diversity
-        channels_used = set(t.channel for t in recent_transactions)
-        channel_diversity = len(channels_used)
+        now = now or datetime.now()
+        start_date = now - timedelta(days=30)
+        transaction_hour = extract('hour', Transaction.created_at)
         
-        # Time pattern analysis
-        transaction_hours = [t.created_at.hour for t in recent_transactions]
-        unusual_hours = sum(1 for hour in transaction_hours if hour < 6 or hour > 22)
-        unusual_hours_ratio = unusual_hours / len(transaction_hours) if transaction_hours else 0
+        # Volume, velocity, channel and time pattern metrics over the last 30 days
+        transaction_metrics = {
+            row.customer_id: row
+            for row in db.query(
+                Transaction.customer_id,
+                func.count(Transaction.id).label('transaction_count'),
+                func.sum(Transaction.base_amount).label('total_volume'),
+                func.avg(Transaction.base_amount).label('avg_transaction'),
+                func.max(Transaction.base_amount).label('max_transaction'),
+                func.count(Transaction.channel.distinct()).label('channel_diversity'),
+                func.sum(case((or_(transaction_hour < 6, transaction_hour > 22), 1), else_=0)).label('unusual_hours'),
+                _window_count_column(now - timedelta(hours=24), 'count_24h'),
+                _window_count_column(now - timedelta(hours=168), 'count_7d')  # 7 days in hours
+            ).filter(
+                and_(
+                    Transaction.customer_id.in_(customer_ids),
+                    Transaction.created_at >= start_date
+                )
+            ).group_by(Transaction.customer_id)
+        }
         
         # Recent alerts
-        recent_alerts = db.query(Alert).join(Transaction).filter(
-            and_(
-                Transaction.customer_id == customer_id,
-                Alert.created_at >= datetime.now() - timedelta(days=30)
-            )
-        ).count()
+        recent_alerts = dict(
+            db.query(Transaction.customer_id, func.count(Alert.id)).join(
+                Alert, Alert.transaction_id == Transaction.id
+            ).filter(
+                and_(
+                    Transaction.customer_id.in_(customer_ids),
+                    Alert.created_at >= start_date
+                )
+            ).group_by(Transaction.customer_id).all()
+        )
         
-        # Customer age (days since account opening)
-        account_age_days = 0
-        if customer.account_opening_date:
-            account_age_days = (datetime.now() - customer.account_opening_date).days
+        risk_factors = {}
+        for customer in customers:
+            metrics = transaction_metrics.get(customer.customer_id)
+            transaction_count = metrics.transaction_count if metrics else 0
+            
+            # Customer age (days since account opening)
+            account_age_days = 0
+            if customer.account_opening_date:
+                account_age_days = (now - customer.account_opening_date).days
+            
+            risk_factors[customer.customer_id] = {
+                'total_volume_30d': metrics.total_volume if metrics else 0,
+                'transaction_count_30d': transaction_count,
+                'avg_transaction_amount': float(metrics.avg_transaction) if metrics else 0,
+                'max_transaction_amount': metrics.max_transaction if metrics else 0,
+                # Integer SUMs come back as Decimal on MySQL
+                'velocity_24h': int(metrics.count_24h) / 24 if metrics else 0.0,
+                'velocity_7d': int(metrics.count_7d) / 168 if metrics else 0.0,
+                'channel_diversity': metrics.channel_diversity if metrics else 0,
+                'unusual_hours_ratio': int(metrics.unusual_hours) / transaction_count if metrics else 0,
+                'recent_alerts_count': recent_alerts.get(customer.customer_id, 0),
+                'account_age_days': account_age_days,
+                'is_pep': customer.is_pep,
+                'risk_rating': customer.risk_rating.value if customer.risk_rating else 'LOW'
+            }
         
-        return {
-            'total_volume_30d': total_volume,
-            'transaction_count_30d': len(recent_transactions),
-            'avg_transaction_amount': avg_transaction,
-            'max_transaction_amount': max_transaction,
-            'velocity_24h': velocity_24h,
-            'velocity_7d': velocity_7d,
-            'channel_diversity': channel_diversity,
-            'unusual_hours_ratio': unusual_hours_ratio,
-            'recent_alerts_count': recent_alerts,
-            'account_age_days': account_age_days,
-            'is_pep': customer.is_pep,
-            'risk_rating': customer.risk_rating.value if customer.risk_rating else 'LOW'
-        }
+        return risk_factors
         
     except Exception as e:
         logger.error(f"Error calculating customer risk factors: {e}")
         return {}
 
+# Categorical encodings shared by the single-row and batch feature extractors; values run 1..n
+_CHANNEL_MAPPING = {
+    'INTERNAL': 1, 'ATM': 2, 'POS': 3, 'MOBILE': 4,
+    'INTERNET': 5, 'BRANCH': 6, 'RTGS': 7, 'SWIFT': 8, 'ZIPIT': 9
+}
+_TYPE_MAPPING = {'CREDIT': 1, 'DEBIT': 2, 'TRANSFER': 3}
+_CURRENCY_MAPPING = {
+    'USD': 1, 'ZWL': 2, 'ZAR': 3, 'EUR': 4, 'GBP': 5,
+    'JPY': 6, 'CNY': 7, 'AUD': 8, 'CAD': 9, 'CHF': 10
+}
+
 def extract_transaction_features(transaction_data: Dict[str, Any]) -> Dict[str, float]:
     """Extract numerical features from transaction data for ML models"""
     try:
@@ -257,24 +385,15 @@ def extract_transaction_features(transaction_data: Dict[str, Any]) -> Dict[str,
         
         # Channel encoding
         channel = transaction_data.get('channel', '').upper()
-        channel_mapping = {
-            'INTERNAL': 1, 'ATM': 2, 'POS': 3, 'MOBILE': 4,
-            'INTERNET': 5, 'BRANCH': 6, 'RTGS': 7, 'SWIFT': 8, 'ZIPIT': 9
-        }
-        features['channel_encoded'] = float(channel_mapping.get(channel, 0))
+        features['channel_encoded'] = float(_CHANNEL_MAPPING.get(channel, 0))
         
         # Transaction type encoding
         txn_type = transaction_data.get('transaction_type', '').upper()
-        type_mapping = {'CREDIT': 1, 'DEBIT': 2, 'TRANSFER': 3}
-        features['transaction_type_encoded'] = float(type_mapping.get(txn_type, 0))
+        features['transaction_type_encoded'] = float(_TYPE_MAPPING.get(txn_type, 0))
         
         # Currency encoding
         currency = transaction_data.get('currency', 'USD')
-        currency_mapping = {
-            'USD': 1, 'ZWL': 2, 'ZAR': 3, 'EUR': 4, 'GBP': 5,
-            'JPY': 6, 'CNY': 7, 'AUD': 8, 'CAD': 9, 'CHF': 10
-        }
-        features['currency_encoded'] = float(currency_mapping.get(currency, 0))
+        features['currency_encoded'] = float(_CURRENCY_MAPPING.get(currency, 0))
         
         # Cross-border indicator
         features['is_cross_border'] = float(bool(transaction_data.get('counterparty_country')))
@@ -288,31 +407,96 @@ def extract_transaction_features(transaction_data: Dict[str, Any]) -> Dict[str,
         logger.error(f"Error extracting transaction features: {e}")
         return {}
 
+def _encode_categories(values: "pd.Series", dtype: "pd.CategoricalDtype") -> "pd.Series":
+    """Encode values with a mapping dtype; category code + 1 is the mapped value and unknowns (-1) become 0"""
+    return (values.astype(dtype).cat.codes + 1).astype('float64')
+
+def _feature_timestamp(value: Any) -> Optional[datetime]:
+    """Parse a timestamp like extract_transaction_features does, returning None where it would fail"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, datetime) else None
+
+def extract_transaction_features_batch(rows: List[Dict[str, Any]]) -> "pd.DataFrame":
+    """
+    Extract the same features as extract_transaction_features for many transactions, one row each.
+    Missing keys get the same defaults as the single-row path. Rows it would reject (returning {}),
+    such as a None or non-numeric base_amount or a None channel, come back as all-NaN rows.
+    """
+    if pd is None:
+        raise ImportError("pandas is required for batch feature extraction")
+    
+    def column(key: str, default: Any) -> "pd.Series":
+        # Per-row .get keeps "key missing" (default) distinct from "key present but None"
+        return pd.Series([row.get(key, default) for row in rows], dtype=object)
+    
+    # Basic transaction features
+    amount = pd.to_numeric(column('base_amount', 0), errors='coerce').astype('float64')
+    
+    # Time-based features, read per row in each timestamp's own local time as the single-row path does;
+    # vectorised parsing would reject a batch mixing UTC offsets or aware and naive values
+    timestamps = [_feature_timestamp(row.get('timestamp', datetime.now())) for row in rows]
+    time_parts = pd.DataFrame(
+        [(ts.hour, ts.weekday(), ts.day, ts.month) if ts is not None else (np.nan,) * 4 for ts in timestamps],
+        columns=['hour', 'day_of_week', 'day_of_month', 'month'],
+        dtype='float64'
+    )
+    hour = time_parts['hour']
+    day_of_week = time_parts['day_of_week']
+    
+    # Non-string values become None here, as .upper() would fail on them in the single-row path
+    channel = column('channel', '').map(lambda value: value.upper() if isinstance(value, str) else None)
+    transaction_type = column('transaction_type', '').map(lambda value: value.upper() if isinstance(value, str) else None)
+    
+    features = pd.DataFrame({
+        'amount': amount,
+        'amount_log': np.log1p(amount),
+        'hour': hour,
+        'day_of_week': day_of_week,
+        'day_of_month': time_parts['day_of_month'],
+        'month': time_parts['month'],
+        'is_weekend': (day_of_week >= 5).astype('float64'),
+        'is_business_hours': hour.between(9, 17).astype('float64'),
+        'channel_encoded': _encode_categories(channel, _CHANNEL_DTYPE),
+        'transaction_type_encoded': _encode_categories(transaction_type, _TYPE_DTYPE),
+        'currency_encoded': _encode_categories(column('currency', 'USD'), _CURRENCY_DTYPE),
+        'is_cross_border': column('counterparty_country', None).map(bool).astype('float64'),
+        'is_high_value': (amount > 10000).astype('float64')
+    })
+    
+    features.loc[amount.isna() | hour.isna() | channel.isna() | transaction_type.isna()] = np.nan
+    return features
+
+def levenshtein_distance(s1: str, s2: str) -> int:
+    """Edit distance between two strings"""
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    
+    if len(s2) == 0:
+        return len(s1)
+    
+    # Two rows reused for the whole computation
+    previous_row = list(range(len(s2) + 1))
+    current_row = [0] * (len(s2) + 1)
+    for i, c1 in enumerate(s1):
+        current_row[0] = i + 1
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row[j + 1] = min(insertions, deletions, substitutions)
+        previous_row, current_row = current_row, previous_row
+    
+    return previous_row[-1]
+
 def calculate_similarity_score(text1: str, text2: str) -> float:
     """Calculate similarity score between two text strings"""
     if not text1 or not text2:
         return 0.0
     
-    # Simple Levenshtein distance-based similarity
-    def levenshtein_distance(s1, s2):
-        if len(s1) < len(s2):
-            return levenshtein_distance(s2, s1)
-        
-        if len(s2) == 0:
-            return len(s1)
-        
-        previous_row = range(len(s2) + 1)
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-        
-        return previous_row[-1]
-    
     text1 = text1.upper().strip()
     text2 = text2.upper().strip()
     
@@ -320,11 +504,16 @@ def calculate_similarity_score(text1: str, text2: str) -> float:
     if max_len == 0:
         return 1.0
     
-    distance = levenshtein_distance(text1, text2)
+    # Simple Levenshtein distance-based similarity, compiled when numba is available
+    if _levenshtein_codes is not None:
+        distance = int(_levenshtein_codes(_char_codes(text1), _char_codes(text2)))
+    else:
+        distance = levenshtein_distance(text1, text2)
     similarity = 1 - (distance / max_len)
     
     return max(0.0, similarity)
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_iban(iban: str) -> bool:
     """Validate IBAN format"""
     if not iban:
@@ -337,17 +526,14 @@ def validate_iban(iban: str) -> bool:
     if not (15 <= len(iban) <= 34):
         return False
     
-    # Check if starts with two letters
-    if not iban[:2].isalpha():
-        return False
-    
-    # Check if next two characters are digits
-    if not iban[2:4].isdigit():
+    # Check if starts with two letters followed by two digits
+    if not _IBAN_PREFIX_RE.match(iban):
         return False
     
     # Simple format validation (full IBAN validation requires country-specific rules)
     return True
 
+@lru_cache(maxsize=_VALIDATION_CACHE_SIZE)
 def validate_swift_code(swift_code: str) -> bool:
     """Validate SWIFT/BIC code format"""
     if not swift_code:
@@ -355,27 +541,31 @@ def validate_swift_code(swift_code: str) -> bool:
     
     swift_code = swift_code.upper().strip()
     
-    # SWIFT codes are 8 or 11 characters
-    if len(swift_code) not in [8, 11]:
-        return False
-    
-    # First 4 characters should be letters (bank code)
-    if not swift_code[:4].isalpha():
-        return False
-    
-    # Next 2 characters should be letters (country code)
-    if not swift_code[4:6].isalpha():
-        return False
-    
-    # Next 2 characters should be alphanumeric (location code)
-    if not swift_code[6:8].isalnum():
-        return False
-    
-    # If 11 characters, last 3 should be alphanumeric (branch code)
-    if len(swift_code) == 11 and not swift_code[8:11].isalnum():
-        return False
-    
-    return True
+    # 8 or 11 characters: letters for bank and country code, alphanumeric location and branch code
+    return bool(_SWIFT_RE.fullmatch(swift_code))
+
+# Field name -> validator used by validate_batch
+_BATCH_VALIDATORS = {
+    'email': validate_email,
+    'phone_number': validate_phone_number,
+    'iban': validate_iban,
+    'swift_code': validate_swift_code
+}
+
+def validate_batch(rows: List[Dict[str, Any]]) -> Dict[int, Set[str]]:
+    """
+    Validate the contact and bank fields of many rows, returning invalid field names by row index.
+    None values are skipped; any other non-string value is reported as invalid.
+    """
+    invalid_fields = {}
+    for index, row in enumerate(rows):
+        failed = {
+            field for field, validator in _BATCH_VALIDATORS.items()
+            if row.get(field) is not None and not (isinstance(row[field], str) and validator(row[field]))
+        }
+        if failed:
+            invalid_fields[index] = failed
+    return invalid_fields
 
 def format_large_number(number: float) -> str:
     """Format large numbers with appropriate suffixes"""
@@ -390,6 +580,14 @@ def format_large_number(number: float) -> str:
 
 def get_business_days_between(start_date: datetime, end_date: datetime) -> int:
     """Calculate business days between two dates"""
+    if hasattr(np, 'busday_count'):
+        if end_date < start_date:
+            return 0
+        # Same days the loop below visits: start_date plus whole days not passing end_date
+        first_day = start_date.date() if isinstance(start_date, datetime) else start_date
+        days = (end_date - start_date).days + 1
+        return int(np.busday_count(first_day, first_day + timedelta(days=days)))
+    
     business_days = 0
     current_date = start_date
     
@@ -404,12 +602,12 @@ def is_business_day(date: datetime) -> bool:
     """Check if a date is a business day"""
     return date.weekday() < 5
 
+# Days from each weekday (Monday = 0) to the next business day
+_NEXT_BUSINESS_DAY_OFFSETS = (1, 1, 1, 1, 3, 2, 1)
+
 def get_next_business_day(date: datetime) -> datetime:
     """Get the next business day"""
-    next_day = date + timedelta(days=1)
-    while next_day.weekday() >= 5:
-        next_day += timedelta(days=1)
-    return next_day
+    return date + timedelta(days=_NEXT_BUSINESS_DAY_OFFSETS[date.weekday()])
 
 def sanitize_input(input_string: str) -> str:
     """Sanitize input string to prevent XSS"""
@@ -417,12 +615,12 @@ def sanitize_input(input_string: str) -> str:
         return ""
     
     # Remove HTML tags
-    clean = re.sub(r'<[^>]+>', '', input_string)
+    clean = _HTML_RE.sub('', input_string)
     
     # Remove potential script injections
-    clean = re.sub(r'javascript:', '', clean, flags=re.IGNORECASE)
-    clean = re.sub(r'vbscript:', '', clean, flags=re.IGNORECASE)
-    clean = re.sub(r'on\w+\s*=', '', clean, flags=re.IGNORECASE)
+    clean = _JS_RE.sub('', clean)
+    clean = _VBS_RE.sub('', clean)
+    clean = _ONEVT_RE.sub('', clean)
     
     return clean.strip()
 
@@ -439,3 +637,39 @@ except ImportError:
             return math.log(1 + x)
     
     np = NumpyFallback()
+
+# pandas backs the batch feature extractor
+try:
+    import pandas as pd
+    
+    # Categories ordered by their encoded value so encoding is an integer codes lookup
+    _CHANNEL_DTYPE = pd.CategoricalDtype(sorted(_CHANNEL_MAPPING, key=_CHANNEL_MAPPING.get), ordered=True)
+    _TYPE_DTYPE = pd.CategoricalDtype(sorted(_TYPE_MAPPING, key=_TYPE_MAPPING.get), ordered=True)
+    _CURRENCY_DTYPE = pd.CategoricalDtype(sorted(_CURRENCY_MAPPING, key=_CURRENCY_MAPPING.get), ordered=True)
+except ImportError:
+    pd = None
+
+# Compile the Levenshtein inner loop when numba is available
+try:
+    from numba import njit
+
+    @njit(cache=True, boundscheck=False)
+    def _levenshtein_codes(a, b):
+        if a.shape[0] < b.shape[0]:
+            a, b = b, a
+        n = b.shape[0]
+        previous_row = np.arange(n + 1)
+        current_row = np.empty(n + 1, np.int64)
+        for i in range(a.shape[0]):
+            current_row[0] = i + 1
+            for j in range(n):
+                cost = 0 if a[i] == b[j] else 1
+                current_row[j + 1] = min(previous_row[j + 1] + 1, current_row[j] + 1, previous_row[j] + cost)
+            previous_row, current_row = current_row, previous_row
+        return previous_row[n]
+
+    def _char_codes(text: str):
+        # One uint32 code point per character so distances match the pure Python version
+        return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+except ImportError:
+    _levenshtein_codes = None